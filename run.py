@@ -1,15 +1,15 @@
 import os
-import json
 import time
-from typing import Any, Dict
+import orjson
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple, Union
 from topic_fetcher import get_topic_content, ContentFetcherError
-from service import transform_topic_content, ContentGenerationError
+from service import transform_topic_content, ContentGenerationError, SNIPPET_LENGTH
 
 
 def create_output_folder():
 
-    if not os.path.exists('output'):
-        os.makedirs('output')
+    os.makedirs('output', exist_ok=True)
 
 
 def write_output_file(filename: str, content: str):
@@ -17,6 +17,33 @@ def write_output_file(filename: str, content: str):
     with open(os.path.join('output', filename), 'w', encoding='utf-8') as f:
         f.write(content)
 
+
+def write_output_files(writes: List[Tuple[str, Union[str, bytes]]]):
+
+    for filename, content in writes:
+        path = os.path.join('output', filename)
+        if isinstance(content, bytes):
+            with open(path, 'wb', buffering=1 << 16) as f:
+                f.write(content)
+        else:
+            with open(path, 'w', encoding='utf-8', buffering=1 << 16) as f:
+                f.write(content)
+
+
+def describe_write_failures(pending: List[Future]) -> str:
+
+    failures = [future.exception() for future in pending]
+    return "".join(f"\n\nAn output file could not be written: {str(e)}" for e in failures if e is not None)
+
+
+def trim_secondary_content(articles: List[Dict[str, Any]], limit: int = SNIPPET_LENGTH):
+
+    if not articles:
+        return
+
+    for article in articles[1:] + articles[0].get("related_articles", []):
+        article["content"] = article.get("content", "")[:limit]
+
 def main():
     create_output_folder()
     start_time = time.time()
@@ -26,35 +53,57 @@ def main():
     tone = os.environ.get('tone', 'informative')
     length = os.environ.get('length', 'medium')
     num_articles = int(os.environ.get('num_articles', '3'))
+    quiet = bool(os.environ.get('QUIET'))
+    compact_metadata = bool(os.environ.get('COMPACT_METADATA'))
 
     if not topic:
         write_output_file('error.txt', "Error: Topic is required.")
         return
     
-    try:
-        write_output_file('status.txt', f"⏳ Researching information about '{topic}'...")
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending: List[Future] = []
+        try:
+            if not quiet:
+                pending.append(executor.submit(write_output_file, 'status.txt', f"⏳ Researching information about '{topic}'..."))
         
-        articles, topic_info = get_topic_content(topic, num_articles=num_articles)
+            articles, topic_info = get_topic_content(topic, num_articles=num_articles)
+            trim_secondary_content(articles)
         
-        write_output_file('status.txt', f"✅ Found {len(articles)} articles about '{topic}'!\n⏳ Now transforming into {tone} {content_type}...")
+            if not quiet:
+                pending.append(executor.submit(write_output_file, 'status.txt', f"✅ Found {len(articles)} articles about '{topic}'!\n⏳ Now transforming into {tone} {content_type}..."))
         
-        transformed_content = transform_topic_content(articles, topic_info, content_type, tone, length)
+            # Chunks land in the real file as they arrive so the user can watch progress;
+            # a failed run removes it so truncated content is never mistaken for output.
+            content_path = os.path.join('output', 'transformed_content.html')
+            try:
+                with open(content_path, 'w', encoding='utf-8') as f:
+                    def write_chunk(chunk: str):
+                        f.write(chunk)
+                        f.flush()
+
+                    transform_topic_content(articles, topic_info, content_type, tone, length, on_chunk=write_chunk)
+            except Exception:
+                if os.path.exists(content_path):
+                    os.remove(content_path)
+                raise
         
-        write_output_file('transformed_content.html', transformed_content)
+            elapsed = round(time.time() - start_time, 2)
         
-        metadata: Dict[str, Any] = {
-            "topic": topic,
-            "content_type": content_type,
-            "tone": tone,
-            "length": length,
-            "articles_analyzed": len(articles),
-            "main_article": articles[0]["title"] if articles else "",
-            "main_article_url": articles[0]["url"] if articles else "",
-            "generation_time_seconds": round(time.time() - start_time, 2)
-        }
-        write_output_file('metadata.json', json.dumps(metadata, indent=2))
+            metadata: Dict[str, Any] = {
+                "topic": topic,
+                "content_type": content_type,
+                "tone": tone,
+                "length": length,
+                "articles_analyzed": len(articles),
+                "main_article": articles[0]["title"] if articles else "",
+                "main_article_url": articles[0]["url"] if articles else "",
+                "generation_time_seconds": elapsed
+            }
+            writes: List[Tuple[str, Union[str, bytes]]] = [
+                ('metadata.json', orjson.dumps(metadata, option=None if compact_metadata else orjson.OPT_INDENT_2))
+            ]
         
-        summary = f"""
+            summary = f"""
         # 🎉 Your Content is Ready!
         
         ## ✨ Content Successfully Generated
@@ -68,7 +117,7 @@ def main():
         - Length: {length}
         - Articles Analyzed: {len(articles)}
         - Main Source: {articles[0]["title"] if articles else ""}
-        - Processing Time: {round(time.time() - start_time, 2)} seconds
+        - Processing Time: {elapsed} seconds
         
         ## 📄 Files Generated:
         - transformed_content.txt: Your main content
@@ -81,19 +130,27 @@ def main():
         
         Thank you for using the Content Alchemist!
         """
-        write_output_file('summary.txt', summary)
+            writes.append(('summary.txt', summary))
+        
+            pending.append(executor.submit(write_output_files, writes))
+        
+            while pending:
+                pending.pop(0).result()
         
-    except ContentFetcherError as e:
-        error_message = f"Research Error: {str(e)}\n\nPlease try a different topic or check your spelling."
-        write_output_file('error.txt', error_message)
+        except ContentFetcherError as e:
+            error_message = f"Research Error: {str(e)}\n\nPlease try a different topic or check your spelling."
+            error_message += describe_write_failures(pending)
+            write_output_file('error.txt', error_message)
     
-    except ContentGenerationError as e:
-        error_message = f"Content Generation Error: {str(e)}\n\nPlease try again with different parameters."
-        write_output_file('error.txt', error_message)
+        except ContentGenerationError as e:
+            error_message = f"Content Generation Error: {str(e)}\n\nPlease try again with different parameters."
+            error_message += describe_write_failures(pending)
+            write_output_file('error.txt', error_message)
     
-    except Exception as e:
-        error_message = f"Unexpected Error: {str(e)}\n\nPlease try again or contact support."
-        write_output_file('error.txt', error_message)
+        except Exception as e:
+            error_message = f"Unexpected Error: {str(e)}\n\nPlease try again or contact support."
+            error_message += describe_write_failures(pending)
+            write_output_file('error.txt', error_message)
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,5 @@
 from google import genai  # type: ignore
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List, Optional
 
 from config import GEMINI_API_KEY
 
@@ -11,26 +11,43 @@ class ContentGenerationError(Exception):
     pass
 
 
-def generate_content(text: str) -> str:
+def generate_content(text: str, on_chunk: Optional[Callable[[str], None]] = None) -> str:
 
+    # Failures inside on_chunk (e.g. the caller's disk writes) are not generation
+    # errors, so they are re-raised as-is once we are out of the wrapping handler.
+    callback_error: Optional[Exception] = None
     try:
-        response = client.models.generate_content(  # type: ignore
+        stream = client.models.generate_content_stream(  # type: ignore
             contents=text,
             model="gemini-2.0-flash-001",
         )
         
-        if not hasattr(response, 'text') or not response.text:
-            raise ContentGenerationError("No content generated from the model")
+        chunks: List[str] = []
+        for chunk in stream:
+            chunk_text = getattr(chunk, 'text', None)
+            if not chunk_text:
+                continue
+            chunks.append(chunk_text)
+            if on_chunk is not None:
+                try:
+                    on_chunk(chunk_text)
+                except Exception as e:
+                    callback_error = e
+                    break
         
-        return response.text
+        if callback_error is None and not chunks:
+            raise ContentGenerationError("No content generated from the model")
     except Exception as e:
         raise ContentGenerationError(f"Error generating content: {str(e)}")
+    
+    if callback_error is not None:
+        raise callback_error
+    
+    return "".join(chunks)
 
 
-def get_content_type_prompt(content_type: str) -> str:
-
-    content_type_prompts = {
-        "youtube_script": """
+_CONTENT_TYPE_PROMPTS = {
+    "youtube_script": """
             Create a YouTube script with:
             1. An attention-grabbing introduction
             2. Clear sections for each main point
@@ -38,21 +55,21 @@ def get_content_type_prompt(content_type: str) -> str:
             4. Include [PAUSE] markers where appropriate for the presenter
             Format the script with INTRO, MAIN CONTENT, and OUTRO sections.
         """,
-        "instagram_post": """
+    "instagram_post": """
             Create an Instagram post with:
             1. An engaging caption (max 2200 characters)
             2. Relevant hashtags (10-15)
             3. A call-to-action for engagement
             Format with CAPTION and HASHTAGS sections.
         """,
-        "twitter_thread": """
+    "twitter_thread": """
             Create a Twitter thread with:
             1. An attention-grabbing first tweet
             2. 5-8 follow-up tweets that expand on the topic
             3. A concluding tweet with call-to-action
             Format as numbered tweets with (1/X) format.
         """,
-        "blog_post": """
+    "blog_post": """
             Create a blog post with:
             1. Compelling headline
             2. Introduction that hooks the reader
@@ -60,7 +77,7 @@ def get_content_type_prompt(content_type: str) -> str:
             4. Conclusion with key takeaways
             Format with proper HTML tags (<h1>, <h2>, <p>, etc.).
         """,
-        "newsletter": """
+    "newsletter": """
             Create a newsletter with:
             1. Catchy subject line
             2. Brief introduction
@@ -68,77 +85,37 @@ def get_content_type_prompt(content_type: str) -> str:
             4. Call-to-action at the end
             Format with SUBJECT LINE, BODY, and FOOTER sections.
         """
-    }
-    
-    default_prompt = """
+}
+
+_DEFAULT_CONTENT_PROMPT = """
         Create well-structured content that covers the main points in an engaging way.
         Include an introduction, main points, and conclusion.
     """
-    
-    return content_type_prompts.get(content_type.lower().replace(" ", "_"), default_prompt)
 
+_TONE_PROMPTS = {
+    "informative": "Maintain an objective, educational tone. Focus on facts and clear explanations.",
+    "humorous": "Use wit, jokes, and playful language. Keep the content light-hearted and entertaining.",
+    "professional": "Maintain a formal, business-appropriate tone. Use industry terminology where relevant.",
+    "conversational": "Write as if having a friendly conversation. Use casual language and occasionally ask questions.",
+    "inspirational": "Use motivational language and storytelling. Focus on possibilities and positive outcomes."
+}
 
-def get_tone_prompt(tone: str) -> str:
+_DEFAULT_TONE = "Write in a balanced, neutral tone that's appropriate for general audiences."
 
-    tone_prompts = {
-        "informative": "Maintain an objective, educational tone. Focus on facts and clear explanations.",
-        "humorous": "Use wit, jokes, and playful language. Keep the content light-hearted and entertaining.",
-        "professional": "Maintain a formal, business-appropriate tone. Use industry terminology where relevant.",
-        "conversational": "Write as if having a friendly conversation. Use casual language and occasionally ask questions.",
-        "inspirational": "Use motivational language and storytelling. Focus on possibilities and positive outcomes."
-    }
-    
-    default_prompt = "Write in a balanced, neutral tone that's appropriate for general audiences."
-    
-    return tone_prompts.get(tone.lower(), default_prompt)
+_LENGTH_GUIDANCE = {
+    "short": "Keep the content concise and to-the-point. Aim for about 250-300 words.",
+    "medium": "Provide moderate detail. Aim for about 500-700 words.",
+    "long": "Offer comprehensive coverage. Aim for about 1000-1500 words."
+}
 
+_DEFAULT_LENGTH = "Create content of appropriate length for the format, focusing on quality over quantity."
 
-def get_length_guidance(length: str) -> str:
 
-    length_guidance = {
-        "short": "Keep the content concise and to-the-point. Aim for about 250-300 words.",
-        "medium": "Provide moderate detail. Aim for about 500-700 words.",
-        "long": "Offer comprehensive coverage. Aim for about 1000-1500 words."
-    }
-    
-    default_guidance = "Create content of appropriate length for the format, focusing on quality over quantity."
-    
-    return length_guidance.get(length.lower(), default_guidance)
-
-def transform_topic_content(articles: List[Dict[str, Any]], topic_info: Dict[str, Any], 
-                        content_type: str, tone: str, length: str) -> str:
-
-    try:
-        content_type_instructions = get_content_type_prompt(content_type)
-        tone_instructions = get_tone_prompt(tone)
-        length_instructions = get_length_guidance(length)
-        
-        main_article = articles[0] if articles else {}
-        main_content = main_article.get("content", "")
-        main_title = main_article.get("title", "")
-        categories = main_article.get("categories", [])
-        
-        related_articles_content = ""
-        related_articles = main_article.get("related_articles", [])
-        
-        if related_articles:
-            related_articles_content = "\n\n## Related Topics\n"
-            for i, article in enumerate(related_articles):
-                related_articles_content += f"\n### {i+1}. {article.get('title', '')}\n"
-                related_articles_content += f"{article.get('content', '')[:300]}...\n"
-        
-        additional_articles_content = ""
-        if len(articles) > 1:
-            additional_articles_content = "\n\n## Additional Information\n"
-            for i, article in enumerate(articles[1:]):
-                additional_articles_content += f"\n### {i+1}. {article.get('title', '')}\n"
-                additional_articles_content += f"{article.get('content', '')[:300]}...\n"
-        
-        prompt = f"""
+_TOPIC_PROMPT_TEMPLATE = """
         # Task: Transform Wikipedia Content into {content_type}
 
         ## Topic Information
-        - Main Topic: {topic_info['topic']}
+        - Main Topic: {topic}
         - Main Article: {main_title}
 
         ## Content Requirements
@@ -159,10 +136,10 @@ def transform_topic_content(articles: List[Dict[str, Any]], topic_info: Dict[str
         {additional_articles_content}
 
         ## Content Categories
-        {', '.join(categories)}
+        {categories}
 
         ## Instructions
-        1. Create a {content_type} about "{topic_info['topic']}" using the provided information
+        1. Create a {content_type} about "{topic}" using the provided information
         2. Maintain a {tone} tone throughout
         3. Format the content appropriately for the chosen content type
         4. Make the content engaging, accurate, and valuable to the audience
@@ -170,11 +147,59 @@ def transform_topic_content(articles: List[Dict[str, Any]], topic_info: Dict[str
         6. Focus on providing value and insights about the topic
         7. Use facts from the provided content but write in your own words
         """
+
+
+def get_content_type_prompt(content_type: str) -> str:
+
+    return _CONTENT_TYPE_PROMPTS.get(content_type.lower().replace(" ", "_"), _DEFAULT_CONTENT_PROMPT)
+
+
+def get_tone_prompt(tone: str) -> str:
+
+    return _TONE_PROMPTS.get(tone.lower(), _DEFAULT_TONE)
+
+
+def get_length_guidance(length: str) -> str:
+
+    return _LENGTH_GUIDANCE.get(length.lower(), _DEFAULT_LENGTH)
+
+# Characters of each secondary article that make it into the prompt.
+SNIPPET_LENGTH = 300
+
+def summarize_articles(heading: str, articles: List[Dict[str, Any]]) -> str:
+
+    if not articles:
+        return ""
+
+    parts = [f"\n\n## {heading}\n"]
+    append = parts.append
+    for i, article in enumerate(articles, 1):
+        append(f"\n### {i}. {article.get('title', '')}\n{article.get('content', '')[:SNIPPET_LENGTH]}...\n")
+
+    return "".join(parts)
+
+def transform_topic_content(articles: List[Dict[str, Any]], topic_info: Dict[str, Any], 
+                        content_type: str, tone: str, length: str,
+                        on_chunk: Optional[Callable[[str], None]] = None) -> str:
+
+    try:
+        main_article = articles[0] if articles else {}
         
-        result = generate_content(prompt)
-        return result
-    
-    except ContentGenerationError:
-        raise
+        prompt = _TOPIC_PROMPT_TEMPLATE.format(
+            content_type=content_type,
+            content_type_instructions=get_content_type_prompt(content_type),
+            tone=tone,
+            tone_instructions=get_tone_prompt(tone),
+            length=length,
+            length_instructions=get_length_guidance(length),
+            topic=topic_info['topic'],
+            main_title=main_article.get("title", ""),
+            main_content=main_article.get("content", ""),
+            related_articles_content=summarize_articles("Related Topics", main_article.get("related_articles", [])),
+            additional_articles_content=summarize_articles("Additional Information", articles[1:]),
+            categories=', '.join(main_article.get("categories", [])),
+        )
     except Exception as e:
         raise ContentGenerationError(f"Error transforming topic content: {str(e)}")
+    
+    return generate_content(prompt, on_chunk)
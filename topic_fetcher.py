@@ -1,33 +1,145 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 import json
+import orjson
 import random
+import re
+import threading
 import time
-from typing import List, Dict, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, Union
 from datetime import datetime
 
+_API_URL = "https://en.wikipedia.org/w/api.php"
+
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'Accept': 'application/json',
+    'Accept-Language': 'en-US,en;q=0.5'
+})
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset({"GET"})
+    )
+))
+
+# Upper bound on in-flight requests per fan-out, to stay polite to the API.
+_MAX_CONCURRENT_REQUESTS = 4
+
+# TextExtracts caps exchars at 1200, so longer extracts are trimmed client-side.
+_MAX_FULL_CONTENT_CHARS = 10000
+
+_SPAN_RE = re.compile(r'</?span[^>]*>')
+
+_USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.4 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/112.0',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/112.0.0.0 Safari/537.36'
+)
+
 class ContentFetcherError(Exception):
     pass
 
+class RateLimiter:
+    """Thread-safe token bucket that blocks callers once the request budget is spent."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            delay = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            self._tokens -= 1
+        if delay:
+            time.sleep(delay)
+
+    def __enter__(self):
+        self.wait()
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+# Wikimedia's anonymous API ceiling; 429s beyond it are retried by the adapter above,
+# which honours Retry-After.
+_RATE_LIMITER = RateLimiter(rate=200, capacity=10)
+
+def get_session() -> requests.Session:
+    """Return the shared session used for all Wikipedia API calls."""
+    return _SESSION
+
 def get_random_user_agent():
-    user_agents = [
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.4 Safari/605.1.15',
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/112.0',
-        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/112.0.0.0 Safari/537.36'
-    ]
-    return random.choice(user_agents)
+    return random.choice(_USER_AGENTS)
 
 def get_headers():
+    return {'User-Agent': get_random_user_agent()}
+
+@lru_cache(maxsize=512)
+def _cached_get(params: Tuple[Tuple[str, Union[str, int]], ...]) -> bytes:
+    """Run an API request and return the raw body; only successful responses are cached."""
+    with _RATE_LIMITER:
+        response = _SESSION.get(_API_URL, headers=get_headers(), params=dict(params), timeout=10)
+    response.raise_for_status()
+    return response.content
+
+def _api_call(params: Dict[str, Union[str, int]], bypass_cache: bool = False) -> Dict[str, Any]:
+    """Run a MediaWiki API query and return the decoded JSON.
+
+    The raw bytes are cached rather than the parsed data, so every caller gets
+    its own fresh dicts and can mutate them safely. Network and decode failures
+    are raised as ContentFetcherError.
+    """
+    key = tuple(sorted(params.items()))
+    fetch = _cached_get.__wrapped__ if bypass_cache else _cached_get
+    try:
+        return orjson.loads(fetch(key))
+    except requests.exceptions.RequestException as e:
+        raise ContentFetcherError(f"Error calling the Wikipedia API: {str(e)}")
+    except json.JSONDecodeError as e:
+        raise ContentFetcherError(f"Error parsing Wikipedia API response: {str(e)}")
+
+def _build_article(page_data: Dict[str, Any], content: Optional[str] = None) -> Dict[str, Any]:
+    """Turn a page object from a prop=extracts|categories|info query into an article dict."""
+    pageid = page_data.get("pageid", 0)
     return {
-        'User-Agent': get_random_user_agent(),
-        'Accept': 'application/json',
-        'Accept-Language': 'en-US,en;q=0.5'
+        "title": page_data.get("title", ""),
+        "content": page_data.get("extract", "") if content is None else content,
+        "url": page_data.get("fullurl", f"https://en.wikipedia.org/?curid={pageid}"),
+        "categories": [cat.get("title", "").removeprefix("Category:") for cat in page_data.get("categories", [])[:10]],
+        "last_modified": page_data.get("touched", ""),
+        "pageid": pageid
     }
 
-def search_wikipedia(topic: str, limit: int = 5) -> List[Dict[str, Any]]:
-    """Search Wikipedia for articles related to the given topic."""
-    search_url = "https://en.wikipedia.org/w/api.php"
+def _get_page(pageid: int, params: Dict[str, Union[str, int]], bypass_cache: bool) -> Dict[str, Any]:
+    data = _api_call(params, bypass_cache)
+    page_data = data.get("query", {}).get("pages", {}).get(str(pageid), {})
+    
+    if not page_data or "missing" in page_data:
+        raise ContentFetcherError(f"Wikipedia article with page ID {pageid} not found")
     
+    return page_data
+
+def clear_cache():
+    """Drop every cached Wikipedia response."""
+    _cached_get.cache_clear()
+
+def search_wikipedia(topic: str, limit: int = 5, bypass_cache: bool = False) -> List[Dict[str, Any]]:
+    """Search Wikipedia for articles related to the given topic."""
     params: Dict[str, str | int] = {
         "action": "query",
         "format": "json",
@@ -38,184 +150,144 @@ def search_wikipedia(topic: str, limit: int = 5) -> List[Dict[str, Any]]:
         "utf8": 1
     }
     
-    try:
-        response = requests.get(search_url, headers=get_headers(), params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        search_results: List[Dict[str, str | int]] = []
-        for result in data.get("query", {}).get("search", []):
-            snippet = result.get("snippet", "")
-            snippet = snippet.replace("<span class=\"searchmatch\">", "")
-            snippet = snippet.replace("</span>", "")
-            
-            search_results.append({
-                "title": result.get("title", ""),
-                "pageid": result.get("pageid", 0),
-                "snippet": snippet,
-                "score": result.get("score", 0),
-                "size": result.get("size", 0),
-                "wordcount": result.get("wordcount", 0),
-                "timestamp": result.get("timestamp", "")
-            })
-        
-        if not search_results:
-            raise ContentFetcherError(f"No Wikipedia articles found for topic: {topic}")
-        
-        return search_results
+    data = _api_call(params, bypass_cache)
     
-    except requests.exceptions.RequestException as e:
-        raise ContentFetcherError(f"Error searching Wikipedia: {str(e)}")
-    except json.JSONDecodeError as e:
-        raise ContentFetcherError(f"Error parsing Wikipedia search results: {str(e)}")
-    except Exception as e:
-        raise ContentFetcherError(f"Unexpected error during Wikipedia search: {str(e)}")
+    search_results: List[Dict[str, str | int]] = []
+    for result in data.get("query", {}).get("search", []):
+        search_results.append({
+            "title": result.get("title", ""),
+            "pageid": result.get("pageid", 0),
+            "snippet": _SPAN_RE.sub("", result.get("snippet", "")),
+            "score": result.get("score", 0),
+            "size": result.get("size", 0),
+            "wordcount": result.get("wordcount", 0),
+            "timestamp": result.get("timestamp", "")
+        })
+    
+    if not search_results:
+        raise ContentFetcherError(f"No Wikipedia articles found for topic: {topic}")
+    
+    return search_results
 
-def get_article_content(pageid: int) -> Dict[str, Any]:
+def get_article_content(pageid: int, bypass_cache: bool = False) -> Dict[str, Any]:
     """Get the content of a Wikipedia article by page ID."""
-    content_url = "https://en.wikipedia.org/w/api.php"
-    
     params: Dict[str, str | int] = {
         "action": "query",
         "format": "json",
-        "prop": "extracts|categories|links|info|images",
+        "prop": "extracts|categories|info",
         "pageids": pageid,
         "exintro": 1,
         "explaintext": 1,
         "exsectionformat": "plain",
         "inprop": "url|displaytitle",
-        "cllimit": 10,
-        "pllimit": 10
+        "cllimit": 10
     }
     
-    try:
-        response = requests.get(content_url, headers=get_headers(), params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        page_data = data.get("query", {}).get("pages", {}).get(str(pageid), {})
-        
-        if not page_data or "missing" in page_data:
-            raise ContentFetcherError(f"Wikipedia article with page ID {pageid} not found")
-        
-        article: Dict[str, str | int | List[str]] = {
-            "title": page_data.get("title", ""),
-            "content": page_data.get("extract", ""),
-            "url": page_data.get("fullurl", f"https://en.wikipedia.org/?curid={pageid}"),
-            "categories": [cat.get("title", "").replace("Category:", "") for cat in page_data.get("categories", [])],
-            "last_modified": page_data.get("touched", ""),
-            "pageid": pageid
-        }
-        
-        return article
-    
-    except requests.exceptions.RequestException as e:
-        raise ContentFetcherError(f"Error fetching Wikipedia article: {str(e)}")
-    except json.JSONDecodeError as e:
-        raise ContentFetcherError(f"Error parsing Wikipedia article data: {str(e)}")
-    except Exception as e:
-        raise ContentFetcherError(f"Unexpected error fetching Wikipedia article: {str(e)}")
+    return _build_article(_get_page(pageid, params, bypass_cache))
 
-def get_full_article_content(pageid: int) -> Dict[str, Any]:
+def get_full_article_content(pageid: int, bypass_cache: bool = False) -> Dict[str, Any]:
     """Get the full content of a Wikipedia article by page ID."""
-    content_url = "https://en.wikipedia.org/w/api.php"
-    
     params: Dict[str, str | int] = {
         "action": "query",
         "format": "json",
-        "prop": "extracts|categories|links|info|images",
+        "prop": "extracts|categories|info",
         "pageids": pageid,
         "explaintext": 1,
         "exsectionformat": "plain",
+        "exlimit": 1,
         "inprop": "url|displaytitle",
-        "cllimit": 10,
-        "pllimit": 10
+        "cllimit": 10
     }
     
-    try:
-        response = requests.get(content_url, headers=get_headers(), params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        page_data = data.get("query", {}).get("pages", {}).get(str(pageid), {})
-        
-        if not page_data or "missing" in page_data:
-            raise ContentFetcherError(f"Wikipedia article with page ID {pageid} not found")
-        
-        full_content = page_data.get("extract", "")
-        
-        if len(full_content) > 10000:
-            full_content = full_content[:10000] + "... [content truncated]"
-        
-        article: Dict[str, str | int | List[str]] = {
-            "title": page_data.get("title", ""),
-            "content": full_content,
-            "url": page_data.get("fullurl", f"https://en.wikipedia.org/?curid={pageid}"),
-            "categories": [cat.get("title", "").replace("Category:", "") for cat in page_data.get("categories", [])],
-            "last_modified": page_data.get("touched", ""),
-            "pageid": pageid
-        }
-        
-        return article
+    page_data = _get_page(pageid, params, bypass_cache)
     
-    except requests.exceptions.RequestException as e:
-        raise ContentFetcherError(f"Error fetching full Wikipedia article: {str(e)}")
-    except json.JSONDecodeError as e:
-        raise ContentFetcherError(f"Error parsing full Wikipedia article data: {str(e)}")
-    except Exception as e:
-        raise ContentFetcherError(f"Unexpected error fetching full Wikipedia article: {str(e)}")
+    full_content = page_data.get("extract", "")
+    
+    if len(full_content) > _MAX_FULL_CONTENT_CHARS:
+        full_content = full_content[:_MAX_FULL_CONTENT_CHARS] + "... [content truncated]"
+    
+    return _build_article(page_data, full_content)
 
-def get_related_articles(pageid: int, limit: int = 3) -> List[Dict[str, Any]]:
-    """Get related Wikipedia articles based on links within the given article."""
-    links_url = "https://en.wikipedia.org/w/api.php"
+def fetch_topic_bundle(topic: str, limit: int = 5, bypass_cache: bool = False) -> List[Dict[str, Any]]:
+    """Search Wikipedia and fetch intro extracts for every hit in a single request."""
+    params: Dict[str, str | int] = {
+        "action": "query",
+        "format": "json",
+        "generator": "search",
+        "gsrsearch": topic,
+        "gsrlimit": limit,
+        "prop": "extracts|categories|info",
+        "exintro": 1,
+        "explaintext": 1,
+        "exsectionformat": "plain",
+        "exlimit": "max",
+        "inprop": "url|displaytitle",
+        "cllimit": "max"
+    }
+    
+    data = _api_call(params, bypass_cache)
+    
+    pages = sorted(data.get("query", {}).get("pages", {}).values(), key=lambda page: page.get("index", 0))
+    
+    if not pages:
+        raise ContentFetcherError(f"No Wikipedia articles found for topic: {topic}")
     
+    return [_build_article(page_data) for page_data in pages]
+
+def get_related_articles(pageid: int, limit: int = 3, bypass_cache: bool = False) -> List[Dict[str, Any]]:
+    """Get related Wikipedia articles based on links within the given article."""
     params: Dict[str, str | int] = {
         "action": "query",
         "format": "json",
         "prop": "links",
         "pageids": pageid,
-        "pllimit": 30
+        "plnamespace": 0,
+        "pllimit": limit
+    }
+    
+    data = _api_call(params, bypass_cache)
+    
+    page_data = data.get("query", {}).get("pages", {}).get(str(pageid), {})
+    
+    relevant_links = [link.get("title", "") for link in page_data.get("links", [])[:limit]]
+    
+    if not relevant_links:
+        return []
+    
+    articles_params: Dict[str, str | int] = {
+        "action": "query",
+        "format": "json",
+        "titles": "|".join(relevant_links),
+        "redirects": 1,
+        "prop": "extracts|categories|info",
+        "exintro": 1,
+        "explaintext": 1,
+        "exsectionformat": "plain",
+        "exlimit": "max",
+        "inprop": "url|displaytitle",
+        "cllimit": "max"
     }
     
+    # Related articles are best-effort: a failed lookup should not sink the whole topic.
     try:
-        response = requests.get(links_url, headers=get_headers(), params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        page_data = data.get("query", {}).get("pages", {}).get(str(pageid), {})
-        
-        links = page_data.get("links", [])
-        
-        filtered_links: List[str] = []
-        for link in links:
-            title = link.get("title", "")
-            if ":" not in title and "Wikipedia" not in title and "Template" not in title and "Category" not in title:
-                filtered_links.append(title)
-        
-        relevant_links = filtered_links[:limit]
-        
-        related_articles: List[Dict[str, Any]] = []
-        for title in relevant_links:
-            try:
-                search_result = search_wikipedia(f'intitle:"{title}"', limit=1)
-                if search_result:
-                    pageid = search_result[0].get("pageid", 0)
-                    article_data = get_article_content(pageid)
-                    related_articles.append(article_data)
-                    time.sleep(0.5)
-            except:
-                continue
-        
-        return related_articles
+        query = _api_call(articles_params, bypass_cache).get("query", {})
+    except ContentFetcherError:
+        return []
     
-    except requests.exceptions.RequestException as e:
-        raise ContentFetcherError(f"Error fetching related articles: {str(e)}")
-    except json.JSONDecodeError as e:
-        raise ContentFetcherError(f"Error parsing related articles data: {str(e)}")
-    except Exception as e:
-        raise ContentFetcherError(f"Unexpected error fetching related articles: {str(e)}")
+    # Keep the link order; redirects and normalisation change titles, so map them back.
+    order = {title: i for i, title in enumerate(relevant_links)}
+    for entry in query.get("normalized", []) + query.get("redirects", []):
+        if entry.get("from") in order:
+            order.setdefault(entry.get("to", ""), order[entry["from"]])
+    
+    pages = sorted(
+        (page for page in query.get("pages", {}).values() if "missing" not in page and "invalid" not in page),
+        key=lambda page: order.get(page.get("title", ""), len(order))
+    )
+    
+    return [_build_article(page_data) for page_data in pages]
 
-def get_topic_content(topic: str, num_articles: int = 3, include_related: bool = True) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+def get_topic_content(topic: str, num_articles: int = 3, include_related: bool = True, bypass_cache: bool = False) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
     """
     Get comprehensive content about a topic from Wikipedia.
     
@@ -223,36 +295,36 @@ def get_topic_content(topic: str, num_articles: int = 3, include_related: bool =
         topic: The topic to search for
         num_articles: Number of main articles to fetch 
         include_related: Whether to fetch related articles
+        bypass_cache: Skip the in-process response cache and hit the API
         
     Returns:
         Tuple of (list of article dictionaries, topic metadata dictionary)
     """
     try:
-        search_results = search_wikipedia(topic, limit=num_articles + 2)
+        bundle = fetch_topic_bundle(topic, limit=num_articles + 2, bypass_cache=bypass_cache)
         
         topic_info: Dict[str, str | int] = {
             "topic": topic,
             "search_term": topic,
-            "num_results": len(search_results),
+            "num_results": len(bundle),
             "timestamp": datetime.now().isoformat()
         }
         
-        articles: List[Dict[str, Any]] = []
-        for i, result in enumerate(search_results[:num_articles]):
-            pageid = result.get("pageid")
-            
-            assert pageid is not None
-            if i == 0:
-                article = get_full_article_content(pageid)
-            else:
-                article = get_article_content(pageid)
-            
-            if i == 0 and include_related:
-                article["related_articles"] = get_related_articles(pageid)
-            
-            articles.append(article)
+        if num_articles < 1:
+            return [], topic_info
+        
+        main_pageid = bundle[0]["pageid"]
+        
+        with ThreadPoolExecutor(max_workers=_MAX_CONCURRENT_REQUESTS) as executor:
+            main_future = executor.submit(get_full_article_content, main_pageid, bypass_cache)
+            related_future = executor.submit(get_related_articles, main_pageid, bypass_cache=bypass_cache) if include_related else None
             
-            time.sleep(0.5)
+            main_article = main_future.result()
+            if related_future is not None:
+                main_article["related_articles"] = related_future.result()
+        
+        articles: List[Dict[str, Any]] = [main_article]
+        articles.extend(bundle[1:num_articles])
         
         return articles, topic_info
         